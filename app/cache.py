@@ -1,37 +1,119 @@
 import hashlib
-import json
 import os
 from datetime import datetime, timezone
-from typing import Any, Dict, Optional
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+from app.db import get_cache_entry, put_cache_entry
+from app.json_utils import dumps, loads
+from app.util import norm_query
+
+# Optional Redis + MessagePack backend, used when REDIS_URL is set and both
+# packages are installed; otherwise entries live in the SQLite kv_cache table.
+try:
+    import msgpack  # type: ignore
+    import redis  # type: ignore
+except ImportError:
+    msgpack = None  # type: ignore
+    redis = None  # type: ignore
 
 CACHE_DIR = "cache"
+REDIS_URL = os.environ.get("REDIS_URL")
+REDIS_TTL_S = int(os.environ.get("GRAPHITE_CACHE_TTL", str(7 * 24 * 3600)))
+
+_redis_client = None
+
+
+def _redis() -> Any:
+    global _redis_client
+    if not REDIS_URL or redis is None or msgpack is None:
+        return None
+    if _redis_client is None:
+        pool = redis.ConnectionPool.from_url(REDIS_URL, max_connections=32)
+        _redis_client = redis.Redis(connection_pool=pool)
+    return _redis_client
+
+
+def _redis_key(query: str) -> str:
+    return f"graphite:est:{query}"
+
+
+def _redis_get(r: Any, query: str) -> Optional[Dict[str, Any]]:
+    # {"cached_at": ..., "payload": ...} or None; Redis errors count as a miss
+    try:
+        raw = r.get(_redis_key(query))
+    except redis.RedisError:
+        return None
+    if raw is None:
+        return None
+    return msgpack.unpackb(raw, raw=False)
 
 
+@lru_cache(maxsize=2048)
 def _safe_key(query: str) -> str:
-    h = hashlib.sha256(query.encode("utf-8")).hexdigest()[:16]
-    return h
+    # must stay sha256[:16]: it names the legacy cache files written before kv_cache
+    return hashlib.sha256(query.encode("utf-8")).hexdigest()[:16]
 
 
 def cache_path_for_query(query: str) -> str:
-    os.makedirs(CACHE_DIR, exist_ok=True)
     return os.path.join(CACHE_DIR, f"{_safe_key(query)}.json")
 
 
 def write_cache(query: str, payload: Dict[str, Any]) -> str:
-    path = cache_path_for_query(query)
-    data = {
-        "query": query,
-        "cached_at": datetime.now(timezone.utc).isoformat(),
-        "payload": payload,
-    }
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-    return path
+    """
+    Stores the payload (Redis if configured, else SQLite kv_cache); returns cached_at.
+    """
+    cached_at = datetime.now(timezone.utc).isoformat()
+    key = norm_query(query)
+    r = _redis()
+    if r is not None:
+        entry = msgpack.packb({"cached_at": cached_at, "payload": payload}, use_bin_type=True)
+        try:
+            r.set(_redis_key(key), entry, ex=REDIS_TTL_S)
+        except redis.RedisError:
+            pass  # best-effort cache
+        return cached_at
+
+    put_cache_entry(key, cached_at, dumps(payload))
+    return cached_at
+
+
+def _read_cache_file(query: str) -> Optional[Dict[str, Any]]:
+    # legacy: one JSON file per query under CACHE_DIR
+    try:
+        with open(cache_path_for_query(query), "rb") as f:
+            return loads(f.read())
+    except FileNotFoundError:
+        return None
 
 
 def read_cache(query: str) -> Optional[Dict[str, Any]]:
-    path = cache_path_for_query(query)
-    if not os.path.exists(path):
+    r = _redis()
+    if r is not None:
+        entry = _redis_get(r, norm_query(query))
+        return None if entry is None else {"query": query, **entry}
+
+    row = get_cache_entry(norm_query(query))
+    if row is None:
+        return _read_cache_file(query)
+    cached_at, payload = row
+    return {"query": query, "cached_at": cached_at, "payload": loads(payload)}
+
+
+def read_cache_body(query: str) -> Optional[Tuple[str, bytes]]:
+    """
+    Returns (cached_at, payload as JSON bytes) without decoding the payload,
+    so a cache hit can be served as-is.
+    """
+    r = _redis()
+    if r is not None:
+        entry = _redis_get(r, norm_query(query))
+        return None if entry is None else (entry.get("cached_at"), dumps(entry.get("payload")))
+
+    row = get_cache_entry(norm_query(query))
+    if row is not None:
+        return row
+    cached = _read_cache_file(query)
+    if cached is None:
         return None
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return cached.get("cached_at"), dumps(cached.get("payload"))
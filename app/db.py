@@ -1,20 +1,33 @@
-import json
 import os
 import sqlite3
-from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional, Tuple
+from contextlib import contextmanager
+from functools import cache
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.db_pool import ConnectionPool, PooledConnection
+from app.json_utils import dumps_str
 
 DB_PATH = os.environ.get("GRAPHITE_DB", "graphite.db")
 
+_pool = ConnectionPool(DB_PATH)
 
-def _utc_now() -> str:
-    return datetime.now(timezone.utc).isoformat()
+# Timestamps are computed by SQLite (UTC, ISO-8601 with milliseconds).
+_SQL_NOW = "strftime('%Y-%m-%dT%H:%M:%fZ','now')"
 
+_SQL_INSERT_COMP = (
+    "INSERT INTO comps (query, title, price, shipping, url, ended, created_at) "
+    f"VALUES (?, ?, ?, ?, ?, ?, {_SQL_NOW})"
+)
+_SQL_INSERT_ESTIMATE = (
+    "INSERT INTO estimates (query, casp, accuracy_pct, confidence, public_json, summary_json, created_at) "
+    f"VALUES (?, ?, ?, ?, ?, ?, {_SQL_NOW})"
+)
+_SQL_ADD_WATCH = f"INSERT OR IGNORE INTO watchlist (query, created_at) VALUES (?, {_SQL_NOW})"
+_SQL_DEL_WATCH = "DELETE FROM watchlist WHERE query=?"
+_SQL_PUT_CACHE = "INSERT OR REPLACE INTO kv_cache (query, cached_at, payload) VALUES (?, ?, ?)"
 
-def _connect() -> sqlite3.Connection:
-    con = sqlite3.connect(DB_PATH)
-    con.row_factory = sqlite3.Row
-    return con
+# Bump when init_db's CREATE/ALTER block changes; stored in PRAGMA user_version.
+_SCHEMA_VERSION = 2
 
 
 def _table_exists(con: sqlite3.Connection, name: str) -> bool:
@@ -37,13 +50,19 @@ def _ensure_column(con: sqlite3.Connection, table: str, col: str, coltype: str)
     con.execute(f"ALTER TABLE {table} ADD COLUMN {col} {coltype}")
 
 
+@cache
 def init_db() -> None:
     """
     Creates tables if missing and performs lightweight migrations (ADD COLUMN)
     so older local DBs don't crash when schema changes.
+    Skipped once the DB's user_version is current; runs at most once per process.
     """
-    con = _connect()
-    try:
+    with _pool.connection() as con:
+        ver = con.execute("PRAGMA user_version").fetchone()[0]
+        if ver >= _SCHEMA_VERSION:
+            return
+
+        con.execute("BEGIN IMMEDIATE")
         # comps
         if not _table_exists(con, "comps"):
             con.execute(
@@ -102,76 +121,83 @@ def init_db() -> None:
                 """
             )
 
+        # cached /estimate payloads (replaces one JSON file per query)
+        con.execute(
+            """
+            CREATE TABLE IF NOT EXISTS kv_cache (
+                query TEXT PRIMARY KEY,
+                cached_at TEXT,
+                payload BLOB
+            )
+            """
+        )
+
+        # indexes for the read helpers (latest-per-query, newest-first lists)
+        con.execute("CREATE INDEX IF NOT EXISTS idx_estimates_query_id ON estimates(query, id DESC)")
+        con.execute("CREATE INDEX IF NOT EXISTS idx_comps_query_created ON comps(query, created_at)")
+        con.execute("CREATE INDEX IF NOT EXISTS idx_watchlist_created ON watchlist(created_at DESC)")
+        con.execute("ANALYZE")
+
+        con.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+        con.commit()
+
+
+@contextmanager
+def transaction() -> Iterator[PooledConnection]:
+    """
+    One BEGIN IMMEDIATE ... COMMIT on the pooled writer (rolled back on error).
+    Pass the connection as `con=` to the insert helpers to batch their writes.
+    """
+    with _pool.connection() as con:
+        con.execute("BEGIN IMMEDIATE")
+        yield con
         con.commit()
-    finally:
-        con.close()
 
 
-def insert_comps(query: str, comps: List[Dict[str, Any]]) -> int:
+def insert_comps(query: str, comps: List[Dict[str, Any]], con: Optional[PooledConnection] = None) -> int:
     """
     Inserts comps; returns number inserted.
     Expects each comp dict may include: title, price, shipping, url, ended.
+    Comps without a price are skipped.
     """
     if not comps:
         return 0
+    if con is None:
+        with transaction() as tx:
+            return insert_comps(query, comps, con=tx)
+
+    rows: List[Tuple[Any, ...]] = [
+        (query, c.get("title"), float(p), c.get("shipping"), c.get("url"), c.get("ended"))
+        for c in comps
+        if (p := c.get("price")) is not None
+    ]
+    if rows:
+        con.stmt_cursor().executemany(_SQL_INSERT_COMP, rows)
+    return len(rows)
+
+
+def insert_estimate(
+    query: str,
+    public_payload: Dict[str, Any],
+    summary_payload: Dict[str, Any],
+    con: Optional[PooledConnection] = None,
+) -> None:
+    if con is None:
+        with _pool.connection() as own:
+            insert_estimate(query, public_payload, summary_payload, con=own)
+        return
 
-    now = _utc_now()
-    rows: List[Tuple[Any, ...]] = []
-    for c in comps:
-        rows.append(
-            (
-                query,
-                c.get("title"),
-                c.get("price"),
-                c.get("shipping"),
-                c.get("url"),
-                c.get("ended"),
-                now,
-            )
-        )
-
-    con = _connect()
-    try:
-        cur = con.cursor()
-        cur.executemany(
-            """
-            INSERT INTO comps (query, title, price, shipping, url, ended, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            """,
-            rows,
-        )
-        con.commit()
-        return cur.rowcount if cur.rowcount is not None else len(rows)
-    finally:
-        con.close()
-
-
-def insert_estimate(query: str, public_payload: Dict[str, Any], summary_payload: Dict[str, Any]) -> None:
-    now = _utc_now()
-    casp = public_payload.get("casp")
-    accuracy_pct = public_payload.get("accuracy_pct")
-    confidence = public_payload.get("confidence_raw")
-
-    con = _connect()
-    try:
-        con.execute(
-            """
-            INSERT INTO estimates (query, casp, accuracy_pct, confidence, public_json, summary_json, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                query,
-                casp,
-                accuracy_pct,
-                confidence,
-                json.dumps(public_payload, ensure_ascii=False),
-                json.dumps(summary_payload, ensure_ascii=False),
-                now,
-            ),
-        )
-        con.commit()
-    finally:
-        con.close()
+    con.stmt_cursor().execute(
+        _SQL_INSERT_ESTIMATE,
+        (
+            query,
+            public_payload.get("casp"),
+            public_payload.get("accuracy_pct"),
+            public_payload.get("confidence_raw"),
+            dumps_str(public_payload),
+            dumps_str(summary_payload),
+        ),
+    )
 
 
 # -----------------------------
@@ -179,44 +205,45 @@ def insert_estimate(query: str, public_payload: Dict[str, Any], summary_payload:
 # -----------------------------
 
 def list_watches() -> List[str]:
-    con = _connect()
-    try:
+    with _pool.connection(readonly=True) as con:
         rows = con.execute(
-            "SELECT query FROM watchlist ORDER BY created_at DESC"
+            "SELECT query FROM watchlist ORDER BY created_at DESC, rowid DESC"
         ).fetchall()
         return [r["query"] for r in rows]
-    finally:
-        con.close()
 
 
 def add_watch(query: str) -> None:
-    if query is None:
+    if not isinstance(query, str) or not query.strip():
         return
-    if not isinstance(query, str):
-        query = str(query)
-    if not query.strip():
-        return
-    con = _connect()
-    try:
-        con.execute(
-            "INSERT OR IGNORE INTO watchlist (query, created_at) VALUES (?, ?)",
-            (query, _utc_now()),
-        )
-        con.commit()
-    finally:
-        con.close()
+    with _pool.connection() as con:
+        con.stmt_cursor().execute(_SQL_ADD_WATCH, (query,))
 
 
 def delete_watch(query: str) -> None:
-    if query is None:
-        return
-    if not isinstance(query, str):
-        query = str(query)
-    if not query.strip():
+    if not isinstance(query, str) or not query.strip():
         return
-    con = _connect()
-    try:
-        con.execute("DELETE FROM watchlist WHERE query=?", (query,))
-        con.commit()
-    finally:
-        con.close()
+    with _pool.connection() as con:
+        con.stmt_cursor().execute(_SQL_DEL_WATCH, (query,))
+
+
+# -----------------------------
+# Cache helpers
+# -----------------------------
+
+def put_cache_entry(query: str, cached_at: str, payload: bytes) -> None:
+    with _pool.connection() as con:
+        con.stmt_cursor().execute(_SQL_PUT_CACHE, (query, cached_at, payload))
+
+
+def get_cache_entry(query: str) -> Optional[Tuple[str, bytes]]:
+    """
+    Returns (cached_at, payload JSON bytes) or None.
+    """
+    with _pool.connection(readonly=True) as con:
+        row = con.execute(
+            "SELECT cached_at, payload FROM kv_cache WHERE query=?",
+            (query,),
+        ).fetchone()
+    if row is None:
+        return None
+    return row["cached_at"], bytes(row["payload"])
@@ -0,0 +1,127 @@
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+from urllib.request import pathname2url
+
+# journal_mode=WAL is persistent in the DB file, so only the writer sets it
+# (a read-only connection cannot change it).
+_WRITER_PRAGMAS = "PRAGMA journal_mode=WAL;"
+
+# Per-connection settings, applied once when a pooled connection is opened.
+_PRAGMAS = """
+PRAGMA synchronous=NORMAL;
+PRAGMA temp_store=MEMORY;
+PRAGMA cache_size=-64000;
+PRAGMA mmap_size=268435456;
+"""
+
+
+class PooledConnection(sqlite3.Connection):
+    """
+    Connection that keeps one cursor around for the hot write statements,
+    so repeat calls reuse it (and its cached prepared statement).
+    """
+
+    _stmt_cursor: Optional[sqlite3.Cursor] = None
+
+    def stmt_cursor(self) -> sqlite3.Cursor:
+        cur = self._stmt_cursor
+        if cur is None:
+            cur = self._stmt_cursor = self.cursor()
+        return cur
+
+
+class ConnectionPool:
+    """
+    Process-wide SQLite pool: one writer connection (serialized by a lock)
+    plus up to `readers` read-only connections handed out via a queue.
+    Connections are opened lazily, kept for the life of the process and
+    closed at exit.
+    """
+
+    def __init__(self, path: str, readers: int = 4) -> None:
+        self.path = path
+        self.readers = max(1, readers)
+        self._writer: Optional[PooledConnection] = None
+        self._write_lock = threading.Lock()
+        self._idle: "queue.Queue[PooledConnection]" = queue.Queue()
+        self._opened: List[PooledConnection] = []
+        self._open_lock = threading.Lock()
+        atexit.register(self.close)
+
+    def _open(self, readonly: bool) -> PooledConnection:
+        if readonly:
+            uri = f"file:{pathname2url(os.path.abspath(self.path))}?mode=ro"
+            con = sqlite3.connect(
+                uri, uri=True, isolation_level=None, check_same_thread=False, factory=PooledConnection
+            )
+        else:
+            # isolation_level=None: autocommit for single statements; batched
+            # writes open their own transaction with BEGIN IMMEDIATE.
+            con = sqlite3.connect(
+                self.path, isolation_level=None, check_same_thread=False, factory=PooledConnection
+            )
+            con.executescript(_WRITER_PRAGMAS)
+        con.row_factory = sqlite3.Row
+        con.executescript(_PRAGMAS)
+        self._opened.append(con)
+        return con
+
+    def _writer_con(self) -> PooledConnection:
+        with self._open_lock:
+            if self._writer is None:
+                self._writer = self._open(readonly=False)
+            return self._writer
+
+    def acquire(self, readonly: bool = False) -> PooledConnection:
+        if not readonly:
+            self._write_lock.acquire()
+            try:
+                return self._writer_con()
+            except BaseException:
+                self._write_lock.release()
+                raise
+
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        # mode=ro cannot create the DB file, so make sure the writer has.
+        self._writer_con()
+        with self._open_lock:
+            readers_open = len(self._opened) - 1
+            if readers_open < self.readers:
+                return self._open(readonly=True)
+        return self._idle.get()
+
+    def release(self, con: PooledConnection) -> None:
+        if con is self._writer:
+            if con.in_transaction:
+                con.rollback()
+            self._write_lock.release()
+        else:
+            self._idle.put(con)
+
+    @contextmanager
+    def connection(self, readonly: bool = False) -> Iterator[PooledConnection]:
+        con = self.acquire(readonly=readonly)
+        try:
+            yield con
+        finally:
+            self.release(con)
+
+    def close(self) -> None:
+        with self._open_lock:
+            for con in self._opened:
+                try:
+                    con.close()
+                except sqlite3.Error:
+                    pass
+            self._opened.clear()
+            self._writer = None
+        self._idle = queue.Queue()
@@ -0,0 +1,82 @@
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from flask import Response, request
+
+from app.cache import read_cache, read_cache_body
+from app.json_utils import ojsonify, ojsonify_with_body
+from app.public_view import build_public_payload
+
+
+def _conditional(resp: Response, cached_at: Optional[str]) -> Response:
+    """
+    Tags a cache-served response with ETag/Last-Modified from cached_at and
+    turns it into a 304 when the client's If-None-Match/If-Modified-Since match.
+    """
+    if not cached_at:
+        return resp
+    resp.set_etag(cached_at, weak=True)
+    try:
+        resp.last_modified = datetime.fromisoformat(cached_at)
+    except ValueError:
+        pass
+    # revalidate every time (a re-seed must show up at once); a match is a bodiless 304
+    resp.headers["Cache-Control"] = "private, no-cache"
+    return resp.make_conditional(request)
+
+
+def serve_from_cache(
+    query: str,
+    *,
+    asking: Optional[float],
+    include_shipping: bool,
+    note: str,
+    reason: Optional[str] = None,
+) -> Optional[Response]:
+    """
+    /estimate response built from the cached payload for `query`, or None on
+    a cache miss. `reason` (a failed live scrape) is echoed in the body; only
+    plain cache-first hits get ETag/304 handling.
+    """
+    meta: Dict[str, Any] = {
+        "ok": True,
+        "platform": "ebay",
+        "query": query,
+        "from_cache": True,
+        "cached_at": None,
+        "include_shipping": include_shipping,
+        "note": note,
+    }
+    if reason is not None:
+        meta["reason"] = reason
+
+    if asking is None:
+        # nothing to recompute: serve the stored payload bytes directly
+        hit = read_cache_body(query)
+        if hit is not None and hit[1].startswith(b"{") and hit[1] != b"{}":
+            cached_at, body = hit
+            meta["cached_at"] = cached_at
+            resp = ojsonify_with_body(meta, body)
+            return resp if reason is not None else _conditional(resp, cached_at)
+
+    cached = read_cache(query)
+    if not cached or not cached.get("payload"):
+        return None
+
+    payload = cached["payload"]
+    # If asking is provided, recompute deal score using cached CASP
+    # (unless the cached deal fields are already for this asking)
+    pub = payload.get("public") or {}
+    casp = pub.get("casp")
+    if casp is not None and asking is not None and pub.get("asking") != asking:
+        payload["public"] = build_public_payload(
+            casp=float(casp),
+            confidence=float(pub.get("confidence_raw") or payload.get("summary", {}).get("confidence") or 0.0),
+            asking=asking,
+        )
+
+    # payload was freshly decoded, so it can be the response dict
+    meta["cached_at"] = cached.get("cached_at")
+    payload.update(meta)
+    resp = ojsonify(payload)
+    return resp if reason is not None else _conditional(resp, meta["cached_at"])
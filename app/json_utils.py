@@ -0,0 +1,56 @@
+import dataclasses
+import json
+from typing import Any, Dict
+
+from flask import Response
+
+# orjson is optional: fall back to stdlib json if it isn't installed.
+try:
+    import orjson  # type: ignore
+except ImportError:
+    orjson = None  # type: ignore
+
+if orjson is not None:
+    _ORJSON_OPTS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(o: Any) -> Any:
+    # dataclasses (e.g. ModelProfile, PriceSummary) and numpy values
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return dataclasses.asdict(o)
+    if hasattr(o, "tolist"):
+        return o.tolist()
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any) -> bytes:
+    """Compact UTF-8 JSON bytes (no pretty-printing, no ASCII escaping)."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTS)
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def dumps_str(obj: Any) -> str:
+    return dumps(obj).decode("utf-8")
+
+
+def loads(data: Any) -> Any:
+    """Parse JSON from bytes or str."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def ojsonify(obj: Any, status: int = 200) -> Response:
+    """
+    jsonify() replacement: orjson-encoded body, no Flask JSON provider.
+    """
+    return Response(dumps(obj), status=status, mimetype="application/json")
+
+
+def ojsonify_with_body(meta: Dict[str, Any], body: bytes, status: int = 200) -> Response:
+    """
+    Response for `{**meta, **payload}` where payload is already encoded
+    (a non-empty JSON object): splices the two objects' bytes together.
+    """
+    return Response(dumps(meta)[:-1] + b"," + body[1:], status=status, mimetype="application/json")
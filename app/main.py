@@ -1,10 +1,22 @@
-from flask import Flask, jsonify, request, render_template
-from typing import Any, Dict, List, Optional
-
-from app.scrape_ebay import scrape_ebay_sold
-from app.pricing import comps_to_prices, summarize_prices, to_dict
-from app.cache import read_cache, write_cache
+import logging
+import math
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from dataclasses import dataclass
+
+from flask import Flask, request, render_template
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.scrape_ebay import scrape_ebay_sold_soa, soa_rows, warmup_scraper
+from app.pricing import comps_to_prices, comps_to_prices_arr, summarize_prices, to_dict
+from app.pricing_numba import warmup as warmup_pricing
+from app.cache import write_cache
 from app.public_view import build_public_payload
+from app.json_utils import ojsonify
+from app.handlers_util import serve_from_cache
+from app.util import norm_query
 from app.db import (
     init_db,
     insert_comps,
@@ -12,19 +24,50 @@ from app.db import (
     add_watch,
     list_watches,
     delete_watch,
+    transaction,
 )
 
+# numpy is optional; /seed and /estimate fall back to plain loops without it.
+try:
+    import numpy as np
+except ImportError:
+    np = None  # type: ignore
+
 # Optional: Step 13 manual model overrides (keep compatibility)
 try:
     from app.model_profiles import get_manual_casp_for_query  # type: ignore
 except Exception:
     get_manual_casp_for_query = None  # type: ignore
 
+# resolved once so the handlers can call it unconditionally
+_MANUAL_CASP = get_manual_casp_for_query if callable(get_manual_casp_for_query) else (lambda q: None)
 
-def _parse_bool(x: str, default: bool = False) -> bool:
-    if x is None:
+
+# Shared worker pool for scrapes; identical in-flight scrapes are deduped
+# so concurrent requests for the same query wait on one Future.
+_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="graphite")
+_INFLIGHT: Dict[Tuple[str, int], Future] = {}
+_INFLIGHT_LOCK = threading.Lock()
+# Cache writes get their own single worker: they never queue behind slow
+# scrapes, and seeds for the same query land in submission order.
+_CACHE_WRITER = ThreadPoolExecutor(max_workers=1, thread_name_prefix="graphite-cache")
+_SCRAPE_TIMEOUT_S = 60.0
+
+# Below this many seed comps the plain loop beats NumPy's setup cost.
+_SEED_NUMPY_MIN = 64
+
+_TRUTHY = frozenset(("1", "true", "yes", "y", "on"))
+
+log = logging.getLogger(__name__)
+
+
+def _flag(raw: Optional[str], default: bool = False) -> bool:
+    """
+    Boolean query-string flag; missing or empty -> default.
+    """
+    if not raw:
         return default
-    return str(x).strip().lower() in ("1", "true", "yes", "y", "on")
+    return raw.strip().lower() in _TRUTHY
 
 
 def _parse_float(x: Optional[str]) -> Optional[float]:
@@ -39,13 +82,121 @@ def _parse_float(x: Optional[str]) -> Optional[float]:
         return None
 
 
+def _parse_int(x: Optional[str], default: int) -> int:
+    if not x:
+        return default
+    try:
+        return int(x)
+    except ValueError:
+        return default
+
+
+@dataclass
+class EstimateArgs:
+    query: str
+    pages: int
+    include_shipping: bool
+    use_cache: bool
+    cache_first: bool
+    asking: Optional[float]
+
+
+def _parse_estimate_args(args: Any, query: str) -> EstimateArgs:
+    """
+    Reads the remaining /estimate query-string args in one place
+    (`query` is validated by the handler first).
+    """
+    get = args.get
+    return EstimateArgs(
+        query=query,
+        pages=max(1, min(_parse_int(get("pages"), 1), 3)),
+        include_shipping=_flag(get("include_shipping")),
+        use_cache=_flag(get("use_cache"), True),
+        cache_first=_flag(get("cache_first")),
+        asking=_parse_float(get("asking")),
+    )
+
+
+def _seed_prices(rows: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[float]]:
+    """
+    Keeps rows whose price parses to a finite value > 0.
+    Returns (kept rows, their prices as floats).
+    """
+    raw = [c.get("price") for c in rows]
+    if np is not None and len(raw) >= _SEED_NUMPY_MIN:
+        try:
+            arr = np.array(raw, dtype=np.float64)  # None -> nan
+        except (TypeError, ValueError):
+            arr = None  # something float() can't parse; use the loop below
+        if arr is not None and arr.ndim == 1:
+            idx = np.flatnonzero(np.isfinite(arr) & (arr > 0))
+            return [rows[i] for i in idx.tolist()], arr[idx].tolist()
+
+    kept: List[Dict[str, Any]] = []
+    prices: List[float] = []
+    for c, p in zip(rows, raw):
+        if p is None:
+            continue
+        try:
+            p = float(p)
+        except (TypeError, ValueError):
+            continue
+        if not math.isfinite(p) or p <= 0:
+            continue
+        kept.append(c)
+        prices.append(p)
+    return kept, prices
+
+
+def _scrape(query: str, pages: int) -> Dict[str, List[Any]]:
+    """
+    scrape_ebay_sold_soa on the shared executor (single-flight per query/pages).
+    Raises RuntimeError on scrape failure or timeout.
+    """
+    key = (norm_query(query), pages)
+    with _INFLIGHT_LOCK:
+        fut = _INFLIGHT.get(key)
+        owner = fut is None
+        if owner:
+            fut = _EXECUTOR.submit(scrape_ebay_sold_soa, query, pages=pages, delay=0.5)
+            _INFLIGHT[key] = fut
+
+    if owner:
+        # registered outside the lock: the callback runs inline if already done
+        def _done(f: Future) -> None:
+            with _INFLIGHT_LOCK:
+                if _INFLIGHT.get(key) is f:
+                    del _INFLIGHT[key]
+
+        fut.add_done_callback(_done)
+
+    try:
+        return fut.result(timeout=_SCRAPE_TIMEOUT_S)
+    except FutureTimeout as e:
+        raise RuntimeError(f"eBay scrape timed out after {_SCRAPE_TIMEOUT_S:.0f}s") from e
+
+
+def _log_cache_write(f: Future) -> None:
+    # background write_cache from /seed: surface failures instead of dropping them
+    exc = f.exception()
+    if exc is not None:
+        log.error("background cache write failed", exc_info=exc)
+
+
 def create_app() -> Flask:
     app = Flask(__name__)
+    # any remaining jsonify/abort responses: no key sorting, no pretty-print
+    # (Flask >= 2.3 replaced JSON_SORT_KEYS / JSONIFY_PRETTYPRINT_REGULAR)
+    app.json.sort_keys = False
+    app.json.compact = True
     init_db()
+    # prime the scraper's connection pool and the pricing JIT without delaying startup
+    _EXECUTOR.submit(warmup_scraper)
+    _EXECUTOR.submit(warmup_pricing)
 
     @app.get("/health")
     def health():
-        return jsonify({"status": "ok"})
+        return ojsonify({"status": "ok"})
 
     @app.get("/")
     def home():
@@ -56,7 +207,7 @@ def create_app() -> Flask:
     # -----------------------
     @app.get("/watchlist")
     def watchlist_get():
-        return jsonify({"ok": True, "items": list_watches()}), 200
+        return ojsonify({"ok": True, "items": list_watches()})
 
     @app.post("/watchlist")
     def watchlist_add():
@@ -67,9 +218,9 @@ def create_app() -> Flask:
         if not isinstance(raw_query, str):
             raw_query = str(raw_query)
         if not raw_query.strip():
-            return jsonify({"ok": False, "error": "Missing query"}), 400
+            return ojsonify({"ok": False, "error": "Missing query"}, 400)
         add_watch(raw_query)
-        return jsonify({"ok": True, "items": list_watches()}), 200
+        return ojsonify({"ok": True, "items": list_watches()})
 
     @app.delete("/watchlist")
     def watchlist_delete():
@@ -80,7 +231,7 @@ def create_app() -> Flask:
             raw_query = str(raw_query)
         if raw_query.strip():
             delete_watch(raw_query)
-        return jsonify({"ok": True, "items": list_watches()}), 200
+        return ojsonify({"ok": True, "items": list_watches()})
 
     # -----------------------
     # Seed demo comps to cache + DB
@@ -92,59 +243,38 @@ def create_app() -> Flask:
         comps = data.get("comps") or []
 
         if not query or not isinstance(comps, list):
-            return (
-                jsonify(
-                    {
-                        "ok": False,
-                        "error": "Bad request. Expected JSON: { query: string, comps: list }",
-                        "example": {
-                            "query": "Carhartt J01",
-                            "comps": [{"title": "Carhartt J01 jacket", "price": 180.0}],
-                        },
-                    }
-                ),
+            return ojsonify(
+                {
+                    "ok": False,
+                    "error": "Bad request. Expected JSON: { query: string, comps: list }",
+                    "example": {
+                        "query": "Carhartt J01",
+                        "comps": [{"title": "Carhartt J01 jacket", "price": 180.0}],
+                    },
+                },
                 400,
             )
 
-        clean_sample: List[Dict[str, Any]] = []
-        prices: List[float] = []
-
-        for c in comps:
-            if not isinstance(c, dict):
-                continue
-            p = c.get("price")
-            if p is None:
-                continue
-            try:
-                p = float(p)
-            except (TypeError, ValueError):
-                continue
-            if p <= 0:
-                continue
-
-            clean_sample.append(
-                {
-                    "title": str(c.get("title") or ""),
-                    "price": p,
-                    "shipping": c.get("shipping"),
-                    "url": c.get("url"),
-                    "ended": c.get("ended"),
-                }
-            )
-            prices.append(p)
+        rows, prices = _seed_prices([c for c in comps if isinstance(c, dict)])
+        clean_sample: List[Dict[str, Any]] = [
+            {
+                "title": str(c.get("title") or ""),
+                "price": p,
+                "shipping": c.get("shipping"),
+                "url": c.get("url"),
+                "ended": c.get("ended"),
+            }
+            for c, p in zip(rows, prices)
+        ]
 
         summary = summarize_prices(prices)
         summary_dict = to_dict(summary)
 
         # CASP: use manual override if available, otherwise median
         casp = summary_dict.get("median")
-        if get_manual_casp_for_query:
-            try:
-                override = get_manual_casp_for_query(query)
-                if override is not None:
-                    casp = override
-            except Exception:
-                pass
+        override = _MANUAL_CASP(query)
+        if override is not None:
+            casp = override
 
         public = build_public_payload(casp=casp, confidence=float(summary_dict.get("confidence") or 0.0))
 
@@ -155,81 +285,59 @@ def create_app() -> Flask:
             "sample": clean_sample[:5],
         }
 
-        write_cache(query, payload)
-
-        # DB writes
-        insert_comps(query, clean_sample)
-        insert_estimate(query, public_payload=public, summary_payload=summary_dict)
+        # DB writes: one transaction; the cache write finishes in the background
+        with transaction() as con:
+            insert_comps(query, clean_sample, con=con)
+            insert_estimate(query, public_payload=public, summary_payload=summary_dict, con=con)
+        # the background write gets its own (shallow) dict; payload becomes the response
+        _CACHE_WRITER.submit(write_cache, query, dict(payload)).add_done_callback(_log_cache_write)
 
-        return jsonify({"ok": True, "query": query, "cached": True, **payload}), 200
+        payload["ok"] = True
+        payload["query"] = query
+        payload["cached"] = True
+        return ojsonify(payload)
 
     # -----------------------
     # Estimate endpoint
     # -----------------------
     @app.get("/estimate")
     def estimate():
+        # reject a missing query before parsing anything else
         query = (request.args.get("query") or "").strip()
-        pages = int(request.args.get("pages") or 1)
-        include_shipping = _parse_bool(request.args.get("include_shipping") or "false", False)
-        use_cache = _parse_bool(request.args.get("use_cache") or "true", True)
-        cache_first = _parse_bool(request.args.get("cache_first") or "false", False)
-        asking = _parse_float(request.args.get("asking"))
-
         if not query:
-            return jsonify({"ok": False, "error": "Missing required ?query=..."}), 400
+            return ojsonify({"ok": False, "error": "Missing required ?query=..."}, 400)
 
-        pages = max(1, min(pages, 3))
+        a = _parse_estimate_args(request.args, query)
+        pages, asking = a.pages, a.asking
+        include_shipping, use_cache, cache_first = a.include_shipping, a.use_cache, a.cache_first
 
         if cache_first and use_cache:
-            cached = read_cache(query)
-            if cached and cached.get("payload"):
-                payload = cached["payload"]
-                # If asking is provided, recompute deal score using cached CASP
-                pub = payload.get("public") or {}
-                casp = pub.get("casp")
-                if casp is not None and asking is not None:
-                    pub = build_public_payload(
-                        casp=float(casp),
-                        confidence=float(pub.get("confidence_raw") or payload.get("summary", {}).get("confidence") or 0.0),
-                        asking=asking,
-                    )
-                    payload["public"] = pub
-
-                return jsonify(
-                    {
-                        "ok": True,
-                        "platform": "ebay",
-                        "query": query,
-                        "from_cache": True,
-                        "cached_at": cached.get("cached_at"),
-                        "include_shipping": include_shipping,
-                        "note": "Served cached result (cache_first=true).",
-                        **payload,
-                    }
-                ), 200
+            resp = serve_from_cache(
+                query,
+                asking=asking,
+                include_shipping=include_shipping,
+                note="Served cached result (cache_first=true).",
+            )
+            if resp is not None:
+                return resp
 
         # live scrape
         try:
-            comps = scrape_ebay_sold(query, pages=pages, delay=0.5)
+            comps = _scrape(query, pages)
         except RuntimeError as e:
-            cached = read_cache(query) if use_cache else None
-            if cached and cached.get("payload"):
-                payload = cached["payload"]
-                return jsonify(
-                    {
-                        "ok": True,
-                        "platform": "ebay",
-                        "query": query,
-                        "from_cache": True,
-                        "cached_at": cached.get("cached_at"),
-                        "include_shipping": include_shipping,
-                        "note": "Live scrape failed; served last cached result.",
-                        "reason": str(e),
-                        **payload,
-                    }
-                ), 200
-
-            return jsonify(
+            resp = None
+            if use_cache:
+                resp = serve_from_cache(
+                    query,
+                    asking=asking,
+                    include_shipping=include_shipping,
+                    note="Live scrape failed; served last cached result.",
+                    reason=str(e),
+                )
+            if resp is not None:
+                return resp
+
+            return ojsonify(
                 {
                     "ok": False,
                     "platform": "ebay",
@@ -240,23 +348,23 @@ def create_app() -> Flask:
                     "sample": [],
                     "reason": str(e),
                     "hint": "Try again later, or reduce pages. eBay sometimes rate-limits automated requests.",
-                }
-            ), 503
+                },
+                503,
+            )
 
-        # compute
-        comps_dicts = [c.__dict__ for c in comps]
-        prices = comps_to_prices(comps_dicts, include_shipping=include_shipping)
+        # compute (comps are columns; only the sample is turned into rows)
+        sample = soa_rows(comps, limit=5)
+        if np is not None:
+            prices = comps_to_prices_arr(comps, include_shipping=include_shipping)
+        else:
+            prices = comps_to_prices(soa_rows(comps), include_shipping=include_shipping)
         summary = summarize_prices(prices)
         summary_dict = to_dict(summary)
 
         casp = summary_dict.get("median")
-        if get_manual_casp_for_query:
-            try:
-                override = get_manual_casp_for_query(query)
-                if override is not None:
-                    casp = override
-            except Exception:
-                pass
+        override = _MANUAL_CASP(query)
+        if override is not None:
+            casp = override
 
         public = build_public_payload(
             casp=casp,
@@ -268,26 +376,35 @@ def create_app() -> Flask:
             "n": summary.n,
             "public": public,
             "summary": summary_dict,
-            "sample": comps_dicts[:5],
+            "sample": sample,
         }
 
         write_cache(query, payload)
         insert_estimate(query, public_payload=public, summary_payload=summary_dict)
 
-        return jsonify(
-            {
-                "ok": True,
-                "platform": "ebay",
-                "query": query,
-                "from_cache": False,
-                "include_shipping": include_shipping,
-                **payload,
-            }
-        ), 200
+        # already encoded into the cache above; reuse it as the response dict
+        payload["ok"] = True
+        payload["platform"] = "ebay"
+        payload["query"] = query
+        payload["from_cache"] = False
+        payload["include_shipping"] = include_shipping
+        return ojsonify(payload)
 
     return app
 
 
 if __name__ == "__main__":
+    # local-only by default, whichever server runs; set GRAPHITE_HOST=0.0.0.0 to expose it
+    host = os.getenv("GRAPHITE_HOST", "127.0.0.1")
+    port = 5000
+
     app = create_app()
-    app.run(debug=True)
+    if os.getenv("FLASK_DEBUG") == "1":
+        app.run(host=host, port=port, debug=True)
+    else:
+        try:
+            from waitress import serve  # type: ignore
+        except ImportError:
+            app.run(host=host, port=port, threaded=True)
+        else:
+            serve(app, host=host, port=port, threads=8)
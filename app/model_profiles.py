@@ -1,13 +1,24 @@
 from __future__ import annotations
 
-import json
 import os
+from bisect import bisect_right
 from dataclasses import dataclass
-from typing import Any, Dict, Optional
+from functools import cache, lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.json_utils import loads
+from app.util import norm_query
 
 
 DEFAULT_PROFILES_PATH = os.path.join("app", "models.json")
 
+# accuracy_pct -> label: pct >= _ACC_THRESHOLDS[i] gets _ACC_LABELS[i + 1]
+_ACC_THRESHOLDS = (20, 40, 60, 80)
+_ACC_LABELS = ("Very Low", "Low", "Medium", "High", "Very High")
+# same mapping per decile (thresholds are multiples of 10): index with pct // 10
+_ACC_LABEL_BY_DECILE = tuple(_ACC_LABELS[bisect_right(_ACC_THRESHOLDS, d * 10)] for d in range(11))
+
 
 @dataclass
 class ModelProfile:
@@ -17,17 +28,42 @@ class ModelProfile:
     note: Optional[str] = None
 
 
-def _quantize_10(x: int) -> int:
-    q = int(round(x / 10.0) * 10)
-    return max(0, min(100, q))
+class Profiles(dict):
+    """
+    key_lc -> ModelProfile, plus `ordered`: the (key_lc, profile) pairs sorted
+    longest key first, precomputed so substring matching prefers the most
+    specific key. Built once by load_profiles.
+    """
+
+    def __init__(self, by_key: Optional[Dict[str, ModelProfile]] = None) -> None:
+        super().__init__(by_key or {})
+        self.ordered: List[Tuple[str, ModelProfile]] = sorted(self.items(), key=lambda kv: -len(kv[0]))
 
 
-def load_profiles(path: str = DEFAULT_PROFILES_PATH) -> Dict[str, ModelProfile]:
-    if not os.path.exists(path):
-        return {}
+# Last dict returned by load_profiles; match_profile memoizes lookups against
+# it (profiles are loaded once and not mutated afterwards).
+_PROFILES_REF: Optional[Dict[str, ModelProfile]] = None
 
-    with open(path, "r", encoding="utf-8") as f:
-        raw = json.load(f)
+
+@lru_cache(maxsize=128)
+def _quantize_10(x: int) -> int:
+    # nearest 10 in integer math, ties to even like round(x / 10.0) (and
+    # public_view.quantize_pct), clamped to 0..100
+    q, r = divmod(x, 10)
+    q = (q + (r > 5 or (r == 5 and q & 1))) * 10
+    return q if 0 <= q <= 100 else (0 if q < 0 else 100)
+
+
+@cache
+def load_profiles(path: str = DEFAULT_PROFILES_PATH) -> Profiles:
+    """
+    Loads models.json once per path per process; callers share the result.
+    """
+    try:
+        # bytes straight to the parser (orjson when installed), no text decode
+        raw = loads(Path(path).read_bytes())
+    except FileNotFoundError:
+        return Profiles()
 
     profiles: Dict[str, ModelProfile] = {}
     for k, v in (raw or {}).items():
@@ -51,37 +87,53 @@ def load_profiles(path: str = DEFAULT_PROFILES_PATH) -> Dict[str, ModelProfile]:
         if acc_i is not None:
             acc_i = _quantize_10(acc_i)
 
-        profiles[str(k).strip().lower()] = ModelProfile(
+        profiles[norm_query(str(k))] = ModelProfile(
             key=str(k).strip(),
             casp=casp_f,
             accuracy_pct=acc_i,
             note=str(note) if note is not None else None,
         )
 
-    return profiles
+    loaded = Profiles(profiles)
+    global _PROFILES_REF
+    _PROFILES_REF = loaded
+    _match_cached.cache_clear()
+    return loaded
 
 
 def match_profile(query: str, profiles: Dict[str, ModelProfile]) -> Optional[ModelProfile]:
     """
     Simple match:
     - exact key match (case-insensitive) wins
-    - otherwise, substring match on the key (first hit) as a convenience
+    - otherwise, substring match on the key as a convenience (longest key
+      wins for loaded Profiles; first hit for a plain dict)
     """
-    q = (query or "").strip().lower()
+    q = norm_query(query)
     if not q:
         return None
+    if profiles is _PROFILES_REF:
+        return _match_cached(q)
+    return _match(q, profiles)
 
+
+def _match(q: str, profiles: Dict[str, ModelProfile]) -> Optional[ModelProfile]:
     if q in profiles:
         return profiles[q]
 
     # substring match
-    for key_lc, prof in profiles.items():
+    candidates = profiles.ordered if isinstance(profiles, Profiles) else profiles.items()
+    for key_lc, prof in candidates:
         if key_lc and key_lc in q:
             return prof
 
     return None
 
 
+@lru_cache(maxsize=4096)
+def _match_cached(q: str) -> Optional[ModelProfile]:
+    return _match(q, _PROFILES_REF or {})
+
+
 def apply_profile_to_public(public_obj: Dict[str, Any], profile: ModelProfile) -> Dict[str, Any]:
     """
     Override CASP/accuracy if provided in the profile.
@@ -96,16 +148,10 @@ def apply_profile_to_public(public_obj: Dict[str, Any], profile: ModelProfile) -
 
         # label can remain whatever public_view computed; but we can refresh it lightly
         pct = out["accuracy_pct"]
-        if pct >= 80:
-            out["accuracy_label"] = "Very High"
-        elif pct >= 60:
-            out["accuracy_label"] = "High"
-        elif pct >= 40:
-            out["accuracy_label"] = "Medium"
-        elif pct >= 20:
-            out["accuracy_label"] = "Low"
+        if 0 <= pct <= 100:
+            out["accuracy_label"] = _ACC_LABEL_BY_DECILE[pct // 10]
         else:
-            out["accuracy_label"] = "Very Low"
+            out["accuracy_label"] = _ACC_LABELS[bisect_right(_ACC_THRESHOLDS, pct)]
 
     if profile.note:
         out["profile_note"] = profile.note
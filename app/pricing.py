@@ -1,10 +1,22 @@
 from __future__ import annotations
 
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 from typing import Any, Dict, List, Optional, Tuple
 
+from app.pricing_numba import HAVE_NUMBA, summarize_array
 
-@dataclass
+# numpy is optional; summarize_prices sorts in Python without it.
+try:
+    import numpy as np
+except ImportError:
+    np = None  # type: ignore
+
+# Below these sizes the pure-Python path is faster than the array handoff.
+_NUMBA_MIN_N = 128
+_PARTITION_MIN_N = 1024
+
+
+@dataclass(slots=True, frozen=True)
 class PriceSummary:
     n: int
     median: Optional[float]
@@ -16,8 +28,7 @@ class PriceSummary:
     confidence: float
 
 
-def _median(xs: List[float]) -> float:
-    xs = sorted(xs)
+def _median_sorted(xs: List[float]) -> float:
     n = len(xs)
     mid = n // 2
     if n % 2 == 1:
@@ -25,8 +36,7 @@ def _median(xs: List[float]) -> float:
     return (xs[mid - 1] + xs[mid]) / 2.0
 
 
-def _percentile(xs: List[float], p: float) -> float:
-    xs = sorted(xs)
+def _percentile_sorted(xs: List[float], p: float) -> float:
     if not xs:
         raise ValueError("empty list")
     if p <= 0:
@@ -44,23 +54,85 @@ def _percentile(xs: List[float], p: float) -> float:
     return d0 + d1
 
 
-def _trimmed_mean(xs: List[float], trim_frac: float = 0.1) -> float:
-    xs = sorted(xs)
+def _trimmed_mean_sorted(xs: List[float], trim_frac: float = 0.1) -> float:
     n = len(xs)
     k = int(n * trim_frac)
     core = xs[k : n - k] if n - 2 * k > 0 else xs
     return sum(core) / len(core)
 
 
-def _clamp(x: float, lo: float, hi: float) -> float:
-    return max(lo, min(hi, x))
+# Unsorted-input wrappers, kept for existing callers.
+def _median(xs: List[float]) -> float:
+    return _median_sorted(sorted(xs))
+
 
+def _percentile(xs: List[float], p: float) -> float:
+    return _percentile_sorted(sorted(xs), p)
 
-def summarize_prices(prices: List[float]) -> PriceSummary:
-    clean = [float(p) for p in prices if p is not None]
-    clean = [p for p in clean if p > 0]
 
-    n = len(clean)
+def _trimmed_mean(xs: List[float], trim_frac: float = 0.1) -> float:
+    n = len(xs)
+    k = int(n * trim_frac)
+    if np is not None and n >= _PARTITION_MIN_N and n - 2 * k > 0:
+        # only the two cut ranks need to be in place, not a full sort
+        part = np.partition(np.asarray(xs, dtype=np.float64), [k, n - k - 1])
+        return float(part[k : n - k].sum()) / (n - 2 * k)
+    return _trimmed_mean_sorted(sorted(xs), trim_frac)
+
+
+def _interp(lo: float, hi: float, k: float) -> float:
+    # linear interpolation between ranks int(k) and int(k) + 1, as _percentile_sorted
+    f = int(k)
+    return lo * (f + 1 - k) + hi * (k - f)
+
+
+def _summarize_partitioned(clean: List[float]) -> Tuple[float, float, float, float, float, float]:
+    """
+    (trimmed_mean, median, p25, p75, min, max) via one np.partition over the
+    ranks those statistics need, instead of a full sort. Needs n >= 5.
+    """
+    arr = np.asarray(clean, dtype=np.float64)
+    n = arr.shape[0]
+    last = n - 1
+    k25 = last * 0.25
+    k75 = last * 0.75
+    f25, f75 = int(k25), int(k75)
+    trim = int(n * 0.1)
+
+    ranks = {0, last, last // 2, n // 2, f25, min(f25 + 1, last), f75, min(f75 + 1, last), trim, n - trim - 1}
+    part = np.partition(arr, sorted(ranks))
+
+    med = (float(part[last // 2]) + float(part[n // 2])) / 2.0
+    p25 = _interp(float(part[f25]), float(part[min(f25 + 1, last)]), k25)
+    p75 = _interp(float(part[f75]), float(part[min(f75 + 1, last)]), k75)
+    # every element between the two trim ranks is in the core, in some order
+    tmean = float(part[trim : n - trim].sum()) / (n - 2 * trim)
+    return tmean, med, p25, p75, float(part[0]), float(part[last])
+
+
+def summarize_prices(prices: Any) -> PriceSummary:
+    """
+    Accepts a list of prices (None allowed) or a float ndarray such as
+    comps_to_prices_arr returns; only positive values are counted.
+    """
+    clean: Any
+    if np is not None and isinstance(prices, np.ndarray):
+        arr = prices.astype(np.float64, copy=False)
+        arr = arr[arr > 0]  # NaN fails the comparison too
+        n = arr.shape[0]
+        # the array paths take it as-is; the pure-Python path wants a list
+        clean = arr if (HAVE_NUMBA and n >= _NUMBA_MIN_N) or n >= _PARTITION_MIN_N else arr.tolist()
+    else:
+        # one pass: drop None, cast, keep positive
+        clean = []
+        append, to_float = clean.append, float
+        for p in prices:
+            if p is not None:
+                p = to_float(p)
+                if p > 0:
+                    append(p)
+        n = len(clean)
+
     if n == 0:
         return PriceSummary(
             n=0,
@@ -73,48 +145,109 @@ def summarize_prices(prices: List[float]) -> PriceSummary:
             confidence=0.0,
         )
 
-    med = _median(clean)
-    p25 = _percentile(clean, 25)
-    p75 = _percentile(clean, 75)
-    tmean = _trimmed_mean(clean, trim_frac=0.1) if n >= 5 else sum(clean) / n
-
-    min_p = min(clean)
-    max_p = max(clean)
+    if HAVE_NUMBA and n >= _NUMBA_MIN_N:
+        tmean, med, p25, p75, min_p, max_p = summarize_array(np.asarray(clean, dtype=np.float64))
+    elif np is not None and n >= _PARTITION_MIN_N:
+        tmean, med, p25, p75, min_p, max_p = _summarize_partitioned(clean)
+    elif n == 1:
+        tmean = med = p25 = p75 = min_p = max_p = clean[0]
+    elif n == 2:
+        # no sort needed; same interpolation as _percentile_sorted over [min_p, max_p]
+        a, b = clean
+        min_p, max_p = (a, b) if a <= b else (b, a)
+        med = tmean = (min_p + max_p) / 2.0
+        p25 = min_p * 0.75 + max_p * 0.25
+        p75 = min_p * 0.25 + max_p * 0.75
+    else:
+        # sort once; every statistic below reads the same sorted list
+        xs = sorted(clean)
+        med = _median_sorted(xs)
+        p25 = _percentile_sorted(xs, 25)
+        p75 = _percentile_sorted(xs, 75)
+        tmean = _trimmed_mean_sorted(xs, trim_frac=0.1) if n >= 5 else sum(xs) / n
+
+        min_p = xs[0]
+        max_p = xs[-1]
 
     size_score = 1.0 - (1.0 / (1.0 + n / 8.0))  
 
     iqr = max(p75 - p25, 0.0)
     rel_spread = iqr / med if med > 0 else 1.0
-    spread_score = 1.0 - _clamp(rel_spread, 0.0, 1.0)
+    # rel_spread >= 0 and both scores are in [0, 1], so only the upper bounds can bind
+    spread_score = 1.0 - (rel_spread if rel_spread < 1.0 else 1.0)
 
-    confidence = _clamp(0.65 * size_score + 0.35 * spread_score, 0.0, 1.0)
+    confidence = 0.65 * size_score + 0.35 * spread_score
+    if confidence > 1.0:
+        confidence = 1.0
 
+    # builtin round, not np.round: numpy rounds scaled halves to even and
+    # disagrees with round() on values like x.xx5
+    rnd = round
     return PriceSummary(
         n=n,
-        median=round(med, 2),
-        trimmed_mean=round(tmean, 2),
-        p25=round(p25, 2),
-        p75=round(p75, 2),
-        min_price=round(min_p, 2),
-        max_price=round(max_p, 2),
-        confidence=round(confidence, 3),
+        median=rnd(med, 2),
+        trimmed_mean=rnd(tmean, 2),
+        p25=rnd(p25, 2),
+        p75=rnd(p75, 2),
+        min_price=rnd(min_p, 2),
+        max_price=rnd(max_p, 2),
+        confidence=rnd(confidence, 3),
     )
 
 
 def comps_to_prices(comps: List[Dict[str, Any]], include_shipping: bool = False) -> List[float]:
+    """
+    Totals (price, plus shipping if asked) for comps with a price; only
+    positive totals are kept, since summarize_prices drops the rest anyway.
+    """
     prices: List[float] = []
+    append, to_float = prices.append, float
     for c in comps:
         p = c.get("price")
         if p is None:
             continue
-        total = float(p)
+        total = to_float(p)
         if include_shipping:
             s = c.get("shipping")
             if s is not None:
-                total += float(s)
-        prices.append(total)
+                total += to_float(s)
+        if total > 0:
+            append(total)
     return prices
 
 
+def comps_to_prices_arr(comps: Any, include_shipping: bool = False) -> Any:
+    """
+    comps_to_prices for numpy: accepts a list of comp dicts or columns
+    ({"price": [...], "shipping": [...]}) and returns a float64 array of the
+    positive totals. Missing shipping counts as 0. Requires numpy.
+    """
+    if np is None:
+        raise RuntimeError("comps_to_prices_arr requires numpy")
+
+    if isinstance(comps, dict):
+        price_col = comps.get("price") or []
+        ship_col = comps.get("shipping") if include_shipping else None
+    else:
+        price_col = [c.get("price") for c in comps]
+        ship_col = [c.get("shipping") for c in comps] if include_shipping else None
+
+    total = np.asarray(price_col, dtype=np.float64)  # None -> nan
+    if ship_col is not None:
+        ship = np.asarray(ship_col, dtype=np.float64)
+        total = total + np.where(np.isnan(ship), 0.0, ship)
+    return total[np.isfinite(total) & (total > 0)]
+
+
 def to_dict(summary: PriceSummary) -> Dict[str, Any]:
-    return asdict(summary)
+    # flat record: a literal is much cheaper than asdict()'s recursive copy
+    return {
+        "n": summary.n,
+        "median": summary.median,
+        "trimmed_mean": summary.trimmed_mean,
+        "p25": summary.p25,
+        "p75": summary.p75,
+        "min_price": summary.min_price,
+        "max_price": summary.max_price,
+        "confidence": summary.confidence,
+    }
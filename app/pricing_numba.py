@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+from typing import Tuple
+
+# numba (and numpy) are optional; summarize_prices keeps its pure-Python path
+# when they are missing.
+try:
+    import numpy as np
+    from numba import njit
+except ImportError:
+    np = None  # type: ignore
+    njit = None  # type: ignore
+
+HAVE_NUMBA = njit is not None
+
+# Below this size _summarize sorts instead of running the multi-rank select.
+_SELECT_MIN_N = 512
+
+
+if HAVE_NUMBA:
+
+    @njit(cache=True)
+    def _select(a, lo, hi, k):
+        # in-place quickselect: afterwards a[k] holds rank k of a[lo..hi],
+        # with nothing larger left of it and nothing smaller right of it.
+        # Median-of-three pivot and a Hoare partition whose scans stop on
+        # values equal to the pivot, so runs of equal prices split evenly
+        # instead of degrading to O(n^2).
+        while hi > lo:
+            x = a[lo]
+            y = a[(lo + hi) // 2]
+            z = a[hi]
+            if x < y:
+                p = y if y < z else (z if x < z else x)
+            else:
+                p = x if x < z else (z if y < z else y)
+
+            i = lo
+            j = hi
+            while i <= j:
+                while a[i] < p:
+                    i += 1
+                while a[j] > p:
+                    j -= 1
+                if i <= j:
+                    v = a[i]
+                    a[i] = a[j]
+                    a[j] = v
+                    i += 1
+                    j -= 1
+
+            # a[lo..j] <= p, a[j+1..i-1] == p, a[i..hi] >= p
+            if k <= j:
+                hi = j
+            elif k >= i:
+                lo = i
+            else:
+                return
+
+    @njit(cache=True)
+    def _interp(xs, k):
+        # same linear interpolation as pricing._percentile_sorted, given
+        # ranks int(k) and int(k) + 1 are in place
+        n = xs.shape[0]
+        f = int(k)
+        c = min(f + 1, n - 1)
+        if f == c:
+            return xs[f]
+        return xs[f] * (c - k) + xs[c] * (k - f)
+
+    @njit(cache=True)
+    def _place_ranks(xs, ranks):
+        # puts every rank in `ranks` (sorted, unique) in place, like
+        # np.partition with several kth: select the middle requested rank,
+        # then the lower ranks only left of it and the upper ones right of it
+        stack = [(0, xs.shape[0] - 1, 0, ranks.shape[0])]
+        while stack:
+            lo, hi, r0, r1 = stack.pop()
+            if r0 >= r1:
+                continue
+            m = (r0 + r1) // 2
+            r = ranks[m]
+            _select(xs, lo, hi, r)
+            stack.append((lo, r - 1, r0, m))
+            stack.append((r + 1, hi, m + 1, r1))
+
+    @njit(cache=True)
+    def _summarize(prices):
+        xs = prices.copy()
+        n = xs.shape[0]
+        last = n - 1
+        k25 = last * 0.25
+        k75 = last * 0.75
+        trim = int(n * 0.1)
+
+        if n < _SELECT_MIN_N:
+            # small arrays: a full sort is cheaper than the selection setup
+            xs.sort()
+        else:
+            # only the ranks the statistics below read
+            ranks = np.unique(np.array([
+                trim,
+                int(k25),
+                min(int(k25) + 1, last),
+                last // 2,
+                n // 2,
+                int(k75),
+                min(int(k75) + 1, last),
+                last - trim,
+            ]))
+            _place_ranks(xs, ranks)
+
+        med = (xs[last // 2] + xs[n // 2]) / 2.0
+        p25 = _interp(xs, k25)
+        p75 = _interp(xs, k75)
+
+        # the core ranks trim..last-trim all sit between the two cut ranks
+        if n >= 5 and n - 2 * trim > 0:
+            tmean = xs[trim : n - trim].mean()
+        else:
+            tmean = xs.mean()
+
+        return tmean, med, p25, p75, xs.min(), xs.max()
+
+
+def summarize_array(prices) -> Tuple[float, float, float, float, float, float]:
+    """
+    (trimmed_mean, median, p25, p75, min, max) for a non-empty float64 array
+    of already-cleaned prices. Only available when HAVE_NUMBA is True.
+    """
+    tmean, med, p25, p75, lo, hi = _summarize(prices)
+    return float(tmean), float(med), float(p25), float(p75), float(lo), float(hi)
+
+
+def warmup() -> None:
+    """
+    Compile the kernel up front so the first large summary doesn't pay for it.
+    """
+    if HAVE_NUMBA:
+        _summarize(np.arange(1.0, 9.0))
@@ -1,6 +1,12 @@
-from typing import Any, Dict, Optional
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
 
+_ACC_THRESHOLDS = (40, 70)
+_ACC_LABELS = ("Low", "Medium", "High")
 
+
+@lru_cache(maxsize=2048)
 def quantize_pct(confidence_0_to_1: float) -> int:
     """
     Quantize confidence to 0,10,20..100.
@@ -9,17 +15,26 @@ def quantize_pct(confidence_0_to_1: float) -> int:
         x = float(confidence_0_to_1)
     except Exception:
         x = 0.0
-    x = max(0.0, min(1.0, x))
-    pct = int(round(x * 100 / 10) * 10)
-    return max(0, min(100, pct))
+    if not 0.0 <= x <= 1.0:
+        x = 0.0 if x < 0.0 else 1.0  # NaN -> 1.0, as max(0, min(1, x)) gave
+    # x is in [0, 1] here, so pct is already within 0..100
+    return int(round(x * 100 / 10) * 10)
+
+
+def _accuracy_label(pct: int) -> str:
+    return _ACC_LABELS[bisect_right(_ACC_THRESHOLDS, pct)]
+
+
+# label per decile of 0..100; the thresholds are multiples of 10, so
+# int(pct) // 10 picks the same label as the bisect for any pct in range
+# (floats included)
+_ACC_LABEL_BY_DECILE = tuple(_accuracy_label(d * 10) for d in range(11))
 
 
 def accuracy_label(pct: int) -> str:
-    if pct >= 70:
-        return "High"
-    if pct >= 40:
-        return "Medium"
-    return "Low"
+    if 0 <= pct <= 100:
+        return _ACC_LABEL_BY_DECILE[int(pct) // 10]
+    return _accuracy_label(pct)
 
 
 def deal_score(casp: float, asking: Optional[float]) -> Dict[str, Any]:
@@ -41,9 +56,20 @@ def deal_score(casp: float, asking: Optional[float]) -> Dict[str, Any]:
             "delta_pct": None,
         }
 
-    a = float(asking)
-    delta = float(casp) - a
-    delta_pct = (delta / float(casp)) * 100.0
+    score, label, delta, delta_pct = _deal_score(float(casp), float(asking))
+    return {
+        "deal_score": score,
+        "deal_label": label,
+        "delta": delta,
+        "delta_pct": delta_pct,
+    }
+
+
+@lru_cache(maxsize=4096)
+def _deal_score(casp: float, asking: float) -> Tuple[int, str, float, float]:
+    # (score, label, delta, delta_pct) for casp > 0; a tuple so cached hits can't be mutated
+    delta = casp - asking
+    delta_pct = (delta / casp) * 100.0
 
     # thresholds are relative to CASP
     # (more below CASP => better deal)
@@ -58,12 +84,7 @@ def deal_score(casp: float, asking: Optional[float]) -> Dict[str, Any]:
     else:
         score, label = 1, "Overpriced"
 
-    return {
-        "deal_score": score,
-        "deal_label": label,
-        "delta": round(delta, 2),
-        "delta_pct": round(delta_pct, 1),
-    }
+    return score, label, round(delta, 2), round(delta_pct, 1)
 
 
 def build_public_payload(
@@ -75,6 +96,16 @@ def build_public_payload(
     """
     Minimal user-facing payload. CASP = Calculated Average Sold Price.
     """
+    # memoized (pure in its inputs); hand out a copy so callers can mutate it
+    return dict(_build_public_payload(casp, confidence, asking))
+
+
+@lru_cache(maxsize=512)
+def _build_public_payload(
+    casp: Optional[float],
+    confidence: float,
+    asking: Optional[float],
+) -> Dict[str, Any]:
     casp_val = None if casp is None else float(casp)
 
     pct = quantize_pct(confidence)
@@ -84,6 +115,8 @@ def build_public_payload(
         "accuracy_label": accuracy_label(pct),
         # keep raw confidence for DB/debugging only
         "confidence_raw": round(float(confidence), 3),
+        # the asking price the deal fields below were computed for
+        "asking": asking,
     }
 
     if casp_val is not None and asking is not None:
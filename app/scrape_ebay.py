@@ -2,15 +2,72 @@ import argparse
 import json
 import re
 import time
-from dataclasses import asdict, dataclass
-from typing import List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, fields
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
 from urllib.parse import urlencode
 
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from lxml import etree
+from lxml import html as lh
 
 EBAY_SEARCH_URL = "https://www.ebay.com/sch/i.html"
 
+# Upper bound on concurrent page fetches per scrape.
+_MAX_PAGE_WORKERS = 4
+
+T = TypeVar("T")
+
+# Browser-like headers, set once on the session rather than per request.
+_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/120.0.0.0 Safari/537.36"
+    ),
+    "Accept-Language": "en-US,en;q=0.9",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
+    "Connection": "keep-alive",
+    "DNT": "1",
+    "Upgrade-Insecure-Requests": "1",
+}
+
+# Shared across pages and requests so TCP/TLS connections are reused.
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=10, pool_maxsize=20))
+_SESSION.headers.update(_HEADERS)
+
+# Listing extraction: lxml with precompiled XPath (class tests match one
+# token of the class attribute, like a CSS class selector).
+def _has_class(name: str) -> str:
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+_HTML_PARSER = lh.HTMLParser(encoding="utf-8")
+_ITEMS_X = etree.XPath(f"//li[{_has_class('s-item')}]")
+_TITLE_X = etree.XPath(f"(.//*[{_has_class('s-item__title')}])[1]")
+_LINK_X = etree.XPath(f"(.//a[{_has_class('s-item__link')}])[1]")
+_PRICE_X = etree.XPath(f"(.//*[{_has_class('s-item__price')}])[1]")
+_SHIP_X = etree.XPath(f"(.//*[{_has_class('s-item__shipping')} or {_has_class('s-item__logisticsCost')}])[1]")
+_ENDED_X = etree.XPath(f"(.//*[{_has_class('s-item__ended-date')}])[1]")
+_TEXT_X = etree.XPath(".//text()[not(parent::script or parent::style)]")
+
+# compiled once; used for every parsed listing
+_NEW_LISTING_RE = re.compile(r"^\s*New Listing\s*", re.IGNORECASE)
+_MONEY_RE = re.compile(r"(\d[\d,]*\.?\d*)")
+# first currency marker in the text; multi-char "$" prefixes listed before bare "$"
+_CURRENCY_RE = re.compile(r"C \$|US \$|AU \$|£|GBP|€|EUR|\$")
+_CURRENCY_BY_MARKER = {
+    "C $": "CAD",
+    "US $": "USD",
+    "AU $": "AUD",
+    "£": "GBP",
+    "GBP": "GBP",
+    "€": "EUR",
+    "EUR": "EUR",
+    "$": "USD",
+}
+
 @dataclass
 class EbayComp:
     title: str
@@ -21,9 +78,12 @@ class EbayComp:
     url: str
     ended: Optional[str]
 
+# Column names for the struct-of-arrays form (same order as EbayComp).
+COMP_FIELDS = tuple(f.name for f in fields(EbayComp))
+
 def _clean_title(raw: str) -> str:
     t = raw.strip()
-    t = re.sub(r"^\s*New Listing\s*", "", t, flags=re.IGNORECASE).strip()
+    t = _NEW_LISTING_RE.sub("", t, count=1).strip()
     return t
 
 def _parse_money(text: str) -> Tuple[Optional[float], Optional[str]]:
@@ -31,21 +91,10 @@ def _parse_money(text: str) -> Tuple[Optional[float], Optional[str]]:
         return None, None
     t = text.strip()
 
-    currency = None
-    if "C $" in t:
-        currency = "CAD"
-    elif "US $" in t:
-        currency = "USD"
-    elif "AU $" in t:
-        currency = "AUD"
-    elif "£" in t or "GBP" in t:
-        currency = "GBP"
-    elif "€" in t or "EUR" in t:
-        currency = "EUR"
-    elif "$" in t:
-        currency = "USD"
-
-    m = re.search(r"(\d[\d,]*\.?\d*)", t)
+    cm = _CURRENCY_RE.search(t)
+    currency = _CURRENCY_BY_MARKER[cm.group()] if cm else None
+
+    m = _MONEY_RE.search(t)
     if not m:
         return None, currency
     
@@ -77,25 +126,12 @@ def build_sold_search_url(query: str, page: int = 1) -> str:
     return f"{EBAY_SEARCH_URL}?{urlencode(params)}"
 
 def fetch_html(url: str, timeout: int = 8, max_retries: int = 2) -> str:
-    headers = {
-        "User-Agent": (
-            "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) "
-            "Chrome/120.0.0.0 Safari/537.36"
-        ),
-        "Accept-Language": "en-US,en;q=0.9",
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
-        "Connection": "keep-alive",
-        "DNT": "1",
-        "Upgrade-Insecure-Requests": "1",
-    }
-
-    session = requests.Session()
+    session = _SESSION
 
     last_status = None
     for attempt in range(1, max_retries + 1):
         try:
-            r = session.get(url, headers=headers, timeout=timeout)
+            r = session.get(url, timeout=timeout)
         except requests.RequestException as e:
             if attempt != max_retries:
                 time.sleep(min(2 ** attempt, 6))
@@ -117,72 +153,155 @@ def fetch_html(url: str, timeout: int = 8, max_retries: int = 2) -> str:
     raise RuntimeError(f"eBay request failed: {last_status} for {url}")
 
 
-def parse_sold_results(html: str) -> List[EbayComp]:
-    soup = BeautifulSoup(html, "lxml")
-    comps: List[EbayComp] = []
+def warmup_scraper(timeout: float = 3.0) -> None:
+    """
+    Best-effort HEAD to eBay so the first scrape reuses an open connection.
+    """
+    try:
+        _SESSION.head(EBAY_SEARCH_URL, timeout=timeout)
+    except requests.RequestException:
+        pass
+
+
+def _text(el: Any) -> str:
+    # element text: stripped fragments joined by single spaces
+    return " ".join(t for t in (frag.strip() for frag in _TEXT_X(el)) if t)
+
 
-    for li in soup.select("li.s-item"):
-        title_el = li.select_one(".s-item__title")
-        link_el = li.select_one("a.s-item__link")
-        price_el = li.select_one(".s-item__price")
+def _first(xpath: Any, el: Any) -> Any:
+    found = xpath(el)
+    return found[0] if found else None
 
-        if not title_el or not link_el or not price_el:
+
+def _iter_rows(html: str) -> Iterator[Tuple[Any, ...]]:
+    # one tuple per listing, fields in COMP_FIELDS order
+    try:
+        doc = lh.fromstring(html.encode("utf-8"), parser=_HTML_PARSER)
+    except etree.ParserError:
+        return  # empty document
+
+    # per-listing helpers as locals (LOAD_FAST instead of a global lookup each row)
+    first, text, clean_title = _first, _text, _clean_title
+    parse_money, parse_shipping = _parse_money, _parse_shipping
+    title_x, link_x, price_x, ship_x, ended_x = _TITLE_X, _LINK_X, _PRICE_X, _SHIP_X, _ENDED_X
+
+    for li in _ITEMS_X(doc):
+        title_el = first(title_x, li)
+        link_el = first(link_x, li)
+        price_el = first(price_x, li)
+
+        if title_el is None or link_el is None or price_el is None:
             continue
 
-        raw_title = title_el.get_text(" ", strip=True)
+        raw_title = text(title_el)
 
         if not raw_title or raw_title.lower() in {"shop on ebay"}:
             continue
 
-        title = _clean_title(raw_title)
-        url = link_el.get("href", "").strip()
+        title = clean_title(raw_title)
+        url = (link_el.get("href") or "").strip()
         if not url:
             continue
 
-        price_text = price_el.get_text(" ", strip=True)
-        price, currency = _parse_money(price_text)
+        price_text = text(price_el)
+        price, currency = parse_money(price_text)
 
-        ship_el = li.select_one(".s-item__shipping, .s-item__logisticsCost")
-        ship_text = ship_el.get_text(" ", strip=True) if ship_el else ""
-        shipping, ship_currency = _parse_shipping(ship_text)
+        ship_el = first(ship_x, li)
+        ship_text = text(ship_el) if ship_el is not None else ""
+        shipping, ship_currency = parse_shipping(ship_text)
 
-        ended_el = li.select_one(".s-item__ended-date")
-        ended = ended_el.get_text(" ", strip=True) if ended_el else None
+        ended_el = first(ended_x, li)
+        ended = text(ended_el) if ended_el is not None else None
 
-        comps.append(
-            EbayComp(
-                title=title,
-                price=price,
-                currency=currency,
-                shipping=shipping,
-                shipping_currency=ship_currency,
-                url=url,
-                ended=ended,
-            )
-        )
+        yield title, price, currency, shipping, ship_currency, url, ended
 
-    return comps
+
+def parse_sold_results(html: str) -> List[EbayComp]:
+    return [EbayComp(*row) for row in _iter_rows(html)]
+
+
+def _empty_columns() -> Dict[str, List[Any]]:
+    return {name: [] for name in COMP_FIELDS}
+
+
+def parse_sold_results_soa(html: str) -> Dict[str, List[Any]]:
+    """
+    parse_sold_results as columns: {"title": [...], "price": [...], ...},
+    one parallel list per EbayComp field, no per-row objects.
+    """
+    cols = _empty_columns()
+    appends = [cols[name].append for name in COMP_FIELDS]
+    for row in _iter_rows(html):
+        for append, v in zip(appends, row):
+            append(v)
+    return cols
+
+
+def soa_rows(cols: Dict[str, List[Any]], limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Row dicts (as asdict(EbayComp) would give) from columns, optionally only the first `limit`.
+    """
+    columns = [cols[name][:limit] for name in COMP_FIELDS]
+    return [dict(zip(COMP_FIELDS, row)) for row in zip(*columns)]
+
+def _fetch_pages(query: str, pages: int, delay: float, parse: Callable[[str], T]) -> List[T]:
+    """
+    Fetches and parses result pages 1..pages concurrently (at most
+    _MAX_PAGE_WORKERS in flight); `delay` spaces out the start of each
+    request. Results come back in page order.
+    """
+    urls = [build_sold_search_url(query, page=p) for p in range(1, pages + 1)]
+
+    def fetch(url: str) -> T:
+        return parse(fetch_html(url))
+
+    if len(urls) <= 1:
+        return [fetch(u) for u in urls]
+
+    with ThreadPoolExecutor(max_workers=min(len(urls), _MAX_PAGE_WORKERS)) as pool:
+        futures = []
+        for i, url in enumerate(urls):
+            if i:
+                time.sleep(delay)
+            futures.append(pool.submit(fetch, url))
+        return [f.result() for f in futures]
 
 def scrape_ebay_sold(query: str, pages: int = 1, delay: float = 1.0) -> List[EbayComp]:
-    all_comps: List[EbayComp] = []
-    for p in range(1, pages + 1):
-        url = build_sold_search_url(query, page=p)
-        html = fetch_html(url)
-        comps = parse_sold_results(html)
-        all_comps.extend(comps)
-
-        if p != pages:
-            time.sleep(delay)
-
-    seen = set()
-    unique: List[EbayComp] = []
-    for c in all_comps:
-        if c.url in seen:
-            continue
-        seen.add(c.url)
-        unique.append(c)
-    
-    return unique
+    """
+    Comps from the first `pages` result pages, in page order, deduped by URL
+    (a repeated URL keeps its first row).
+    """
+    # insertion-ordered dict keyed by URL; setdefault keeps the first row
+    by_url: Dict[str, EbayComp] = {}
+    add = by_url.setdefault
+    for page in _fetch_pages(query, pages, delay, parse_sold_results):
+        for c in page:
+            add(c.url, c)
+    return list(by_url.values())
+
+def scrape_ebay_sold_soa(query: str, pages: int = 1, delay: float = 1.0) -> Dict[str, List[Any]]:
+    """
+    scrape_ebay_sold, but returns columns (see parse_sold_results_soa),
+    deduped the same way.
+    """
+    results = _fetch_pages(query, pages, delay, parse_sold_results_soa)
+    if len(results) == 1:
+        cols = results[0]
+    else:
+        cols = _empty_columns()
+        for page in results:
+            for name in COMP_FIELDS:
+                cols[name].extend(page[name])
+
+    # url -> index of its first row, in first-seen order (as scrape_ebay_sold)
+    first: Dict[str, int] = {}
+    add = first.setdefault
+    for i, u in enumerate(cols["url"]):
+        add(u, i)
+    keep = list(first.values())
+    if len(keep) == len(cols["url"]):
+        return cols
+    return {name: [col[i] for i in keep] for name, col in cols.items()}
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="Scrape eBay SOLD listings for a query.")
@@ -0,0 +1,12 @@
+import sys
+from functools import lru_cache
+
+
+@lru_cache(maxsize=4096)
+def norm_query(query: str) -> str:
+    """
+    Case- and whitespace-insensitive lookup key for a query (cache entries,
+    profile matching, scrape dedup). Interned, so repeat lookups of a hot
+    query share one str object and dict probes short-circuit on identity.
+    """
+    return sys.intern((query or "").strip().casefold())